@@ -52,11 +52,14 @@ check_dependencies() {
     fi
 
     # Check Python dependencies
-    if ! python3 -c "import cryptography" 2>/dev/null; then
+    if ! python3 -c "import cryptography, numpy" 2>/dev/null; then
         echo -e "${RED}[ERROR]${NC} Missing Python dependencies"
-        echo -e "${YELLOW}[INFO]${NC} Install with: pip install cryptography"
+        echo -e "${YELLOW}[INFO]${NC} Install with: pip install cryptography numpy"
         return 1
     fi
+    if ! python3 -c "import uvloop" 2>/dev/null; then
+        echo -e "${YELLOW}[INFO]${NC} Optional: pip install uvloop for a faster client event loop"
+    fi
 
     # Check if port is available
     if netstat -tlnp 2>/dev/null | grep -q ":$SERVER_PORT "; then
@@ -165,21 +168,31 @@ monitor_benchmark() {
 
 # --- START: ADDED/FIXED SECTION ---
 
+# Send SIGTERM and block until the child exits, escalating to SIGKILL once the
+# grace period runs out (a watchdog fires the KILL, so there is no polling loop)
+stop_process() {
+    local pid=$1
+    local grace=$2
+
+    kill -TERM "$pid" 2>/dev/null || return 0
+    ( sleep "$grace"; kill -KILL "$pid" 2>/dev/null ) &
+    local watchdog=$!
+    wait "$pid" 2>/dev/null || true
+    kill "$watchdog" 2>/dev/null || true
+    wait "$watchdog" 2>/dev/null || true
+}
+
 cleanup() {
     echo -e "\n${YELLOW}[CLEANUP]${NC} Stopping benchmark..."
 
     if [ -n "${GENERATOR_PID:-}" ] && kill -0 $GENERATOR_PID 2>/dev/null; then
         echo -e "${BLUE}[CLEANUP]${NC} Stopping generator..."
-        kill -TERM $GENERATOR_PID 2>/dev/null
-        sleep 1
-        kill -KILL $GENERATOR_PID 2>/dev/null
+        stop_process $GENERATOR_PID 1
     fi
 
     if [ -n "${SERVER_PID:-}" ] && kill -0 $SERVER_PID 2>/dev/null; then
         echo -e "${BLUE}[CLEANUP]${NC} Stopping server..."
-        kill -TERM $SERVER_PID 2>/dev/null
-        sleep 2
-        kill -KILL $SERVER_PID 2>/dev/null
+        stop_process $SERVER_PID 2
     fi
 
     echo -e "${GREEN}[COMPLETE]${NC} Cleanup finished"
@@ -64,11 +64,14 @@ check_dependencies() {
             return 1
         fi
     fi
-    if ! python3 -c "import cryptography" 2>/dev/null; then
-        echo -e "${RED}[ERROR]${NC} Missing Python dependency: cryptography"
-        echo -e "${YELLOW}[INFO]${NC} Install with: pip install cryptography"
+    if ! python3 -c "import cryptography, numpy" 2>/dev/null; then
+        echo -e "${RED}[ERROR]${NC} Missing Python dependencies"
+        echo -e "${YELLOW}[INFO]${NC} Install with: pip install cryptography numpy"
         return 1
     fi
+    if ! python3 -c "import uvloop" 2>/dev/null; then
+        echo -e "${YELLOW}[INFO]${NC} Optional: pip install uvloop for a faster client event loop"
+    fi
     if netstat -tlnp 2>/dev/null | grep -q ":$SERVER_PORT "; then
         echo -e "${RED}[ERROR]${NC} Port $SERVER_PORT is already in use"
         return 1
@@ -161,20 +164,27 @@ monitor_benchmark() {
     echo -e "${GREEN}[COMPLETE]${NC} SGX server finished (${SUMS} summations reached)"
 }
 
+# Send SIGTERM and block until the child exits, escalating to SIGKILL once the
+# grace period runs out (a watchdog fires the KILL, so there is no polling loop)
+stop_process() {
+    local pid=$1
+    local grace=$2
+
+    kill -TERM "$pid" 2>/dev/null || return 0
+    ( sleep "$grace"; kill -KILL "$pid" 2>/dev/null ) &
+    local watchdog=$!
+    wait "$pid" 2>/dev/null || true
+    kill "$watchdog" 2>/dev/null || true
+    wait "$watchdog" 2>/dev/null || true
+}
+
 cleanup() {
     echo -e "\n${YELLOW}[CLEANUP]${NC} Stopping SGX benchmark..."
     if [ -n "${GENERATOR_PID:-}" ] && kill -0 $GENERATOR_PID 2>/dev/null; then
-        kill -TERM $GENERATOR_PID 2>/dev/null || true
-    fi
-    if [ -n "${SERVER_PID:-}" ] && kill -0 $SERVER_PID 2>/dev/null; then
-        kill -TERM $SERVER_PID 2>/dev/null || true
-    fi
-    sleep 2
-    if [ -n "${GENERATOR_PID:-}" ] && kill -0 $GENERATOR_PID 2>/dev/null; then
-        kill -KILL $GENERATOR_PID 2>/dev/null || true
+        stop_process $GENERATOR_PID 2
     fi
     if [ -n "${SERVER_PID:-}" ] && kill -0 $SERVER_PID 2>/dev/null; then
-        kill -KILL $SERVER_PID 2>/dev/null || true
+        stop_process $SERVER_PID 2
     fi
     echo -e "${GREEN}[COMPLETE]${NC} SGX cleanup finished"
 }
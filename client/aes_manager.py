@@ -1,38 +1,141 @@
+import contextlib
+import hashlib
+import json
+import os
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+from functools import lru_cache
+import numpy as np
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.primitives import padding, hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes
+from .logger import Logger
+
+KEY_CACHE_PATH = ".key_cache.json"
+
+# Must match the server's derivation (server/aes_manager.cpp); cached keys
+# are only valid for the iteration count they were derived with
+PBKDF2_ITERATIONS = 100000
+KEY_SIZE = 32
+
+# Readings are packed as '>IHHHHB' (13 bytes), so PKCS7 always appends this trailer
+RECORD_SIZE = 13
+RECORD_PADDING = b'\x03' * 3
+BLOCK_SIZE = 16
+
+@lru_cache(maxsize=None)
+def _derive(device_id, iterations=PBKDF2_ITERATIONS):
+    salt = device_id.encode()[:16].ljust(16, b'0')
+    return hashlib.pbkdf2_hmac('sha256', f"smart_meter_{device_id}".encode(), salt, iterations, dklen=KEY_SIZE)
 
 class AESManager:
-    def __init__(self):
+    def __init__(self, key_cache_path=KEY_CACHE_PATH, cached_keys=None):
         self.device_keys = {}
 
+        # Per-device crypto state, stored by index so batch callers can skip
+        # the device_id hash lookup on every message. IVs are packed back to
+        # back (16 bytes per device) and exposed as one array via iv_table
+        self.device_indices = {}
+        self.device_ivs = bytearray()
+        self.device_encryptors = []
+        self._iv_table = None
+        self.key_cache_path = key_cache_path
+        # Callers that already hold the keys (e.g. worker processes) skip the disk
+        self.cached_keys = self._load_key_cache() if cached_keys is None else dict(cached_keys)
+
+    def _load_key_cache(self):
+        # Keys are a pure function of device_id, so a previous run's keys stay valid
+        try:
+            with open(self.key_cache_path) as f:
+                keys = {device_id: bytes.fromhex(key) for device_id, key in json.load(f).items()}
+        except (OSError, ValueError, AttributeError, TypeError):
+            return {}
+        # A malformed entry is re-derived rather than handed to AES
+        return {device_id: key for device_id, key in keys.items() if len(key) == KEY_SIZE}
+
+    def save_key_cache(self):
+        if all(device_id in self.cached_keys for device_id in self.device_keys):
+            return
+
+        # Device processes started together all save at once; serialize the
+        # read-merge-write so no process drops keys another one just added
+        tmp_path = f"{self.key_cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(f"{self.key_cache_path}.lock", "a") as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+
+                merged = self._load_key_cache()
+                merged.update(self.cached_keys)
+                merged.update(self.device_keys)
+
+                with open(tmp_path, "w") as f:
+                    json.dump({device_id: key.hex() for device_id, key in merged.items()}, f)
+                os.replace(tmp_path, self.key_cache_path)
+        except OSError as e:
+            # The cache only saves startup time; keep running on the keys in memory
+            Logger.warning(f"Could not save key cache {self.key_cache_path}: {e}")
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            return
+        self.cached_keys = merged
+
     def generate_device_key(self, device_id):
-        salt = device_id.encode()[:16].ljust(16, b'0')
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-            backend=default_backend()
-        )
-        key = kdf.derive(f"smart_meter_{device_id}".encode())
+        if device_id in self.device_keys:
+            return self.device_keys[device_id]
+
+        key = self.cached_keys.get(device_id)
+        if key is None:
+            key = _derive(device_id)
         self.device_keys[device_id] = key
+
+        # Deterministic IV, so the single-block CBC encryption below is
+        # ECB(key, iv XOR block) and one ECB encryptor can be kept per device
+        iv_seed = hashes.Hash(hashes.SHA256())
+        iv_seed.update(key + device_id.encode())
+        iv = iv_seed.finalize()[:16]
+        encryptor = Cipher(algorithms.AES(key), modes.ECB()).encryptor()
+
+        self.device_indices[device_id] = len(self.device_encryptors)
+        self.device_ivs += iv
+        self.device_encryptors.append(encryptor)
+        self._iv_table = None
         return key
 
+    @property
+    def iv_table(self):
+        """All device IVs as an (N, 16) uint8 array, indexed like device_indices"""
+        if self._iv_table is None:
+            self._iv_table = np.frombuffer(bytes(self.device_ivs), dtype=np.uint8).reshape(-1, BLOCK_SIZE)
+        return self._iv_table
+
     def encrypt_fixed_size(self, device_id, data):
-        key = self.device_keys[device_id]
+        assert len(data) == RECORD_SIZE
+        return self.encrypt_batch(device_id, [data])
 
-        # Generate deterministic IV
-        iv_seed = hashes.Hash(hashes.SHA256(), backend=default_backend())
-        iv_seed.update(key + device_id.encode())
-        iv = iv_seed.finalize()[:16]
+    def encrypt_batch(self, device_id, records):
+        """Encrypt several 13-byte records for one device in a single cipher call
 
-        cipher = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
-        encryptor = cipher.encryptor()
+        Each record stays its own one-block message; the 16-byte ciphertexts
+        are returned back to back in the order given
+        """
+        idx = self.device_indices[device_id]
+        iv = int.from_bytes(self.device_ivs[idx * BLOCK_SIZE:(idx + 1) * BLOCK_SIZE], 'big')
+        blocks = b''.join(
+            (int.from_bytes(data + RECORD_PADDING, 'big') ^ iv).to_bytes(BLOCK_SIZE, 'big')
+            for data in records
+        )
+        return self.device_encryptors[idx].update(blocks)
 
-        padder = padding.PKCS7(128).padder()
-        padded_data = padder.update(data) + padder.finalize()
+    def mask_records(self, device_indices, records):
+        """Pad an (N, 13) uint8 array of records and XOR each with its device's IV"""
+        blocks = np.empty((len(records), BLOCK_SIZE), dtype=np.uint8)
+        blocks[:, :RECORD_SIZE] = records
+        blocks[:, RECORD_SIZE:] = RECORD_PADDING[0]
+        blocks ^= self.iv_table[device_indices]
+        return blocks.tobytes()
 
-        encrypted = encryptor.update(padded_data) + encryptor.finalize()
-        return encrypted
+    def encrypt_masked_block(self, idx, block):
+        """Encrypt one block produced by mask_records"""
+        return self.device_encryptors[idx].update(block)
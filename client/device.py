@@ -1,28 +1,73 @@
 import asyncio
+import math
 import time
 import random
 import struct
-from datetime import datetime
-import numpy as np
-from .aes_manager import AESManager
+from collections import namedtuple
+from .aes_manager import AESManager, BLOCK_SIZE
 from .logger import Logger
+from .net import tune_socket
+
+Reading = namedtuple('Reading', 'timestamp voltage current power frequency')
+
+# Wire layout of one reading, parsed by the server
+RECORD_PACKER = struct.Struct('>IHHHHB')
+
+# Load curve by local hour, peaking in the evening
+DAILY_FACTORS = tuple(0.7 + 0.3 * (1 + math.sin((hour - 6) * math.pi / 12)) for hour in range(24))
+
+# Seconds to wait before reconnecting after a failure, doubled per failed attempt
+RECONNECT_DELAY_MIN = 0.5
+RECONNECT_DELAY_MAX = 30.0
 
 class EdgeDevice:
-    def __init__(self, device_id, server_host, server_port, interval):
+    def __init__(self, device_id, server_host, server_port, interval, drain_every=10, aes_manager=None, batch_size=1):
         self.device_id = device_id
         self.server_host = server_host
         self.server_port = server_port
         self.interval = interval
-        self.aes_manager = AESManager()
-        self.aes_manager.generate_device_key(device_id)
+        self.header = f"{device_id}:16\n".encode()
+        self.device_num = int(device_id.split('_')[1]) & 0xFFFF
+
+        # Devices simulated in one process share a manager; its owner saves the key cache
+        if aes_manager is None:
+            self.aes_manager = AESManager()
+            self.aes_manager.generate_device_key(device_id)
+            self.aes_manager.save_key_cache()
+        else:
+            self.aes_manager = aes_manager
+            self.aes_manager.generate_device_key(device_id)
         self.message_count = 0
 
+        # Readings waiting to be encrypted and sent together. A failed send
+        # keeps the newest batch_size - 1 of them for the next attempt, so as
+        # without batching one reading is lost per failed send
+        self.batch_size = batch_size
+        self.batch = []
+        self.failed_sends = 0
+        self._hour = 0
+        self._next_hour_at = 0
+
+        # One long-lived connection per device, reopened only when it drops
+        self.reader = None
+        self.writer = None
+        self.drain_every = drain_every
+        self.pending_writes = 0
+        self.connect_lock = asyncio.Lock()
+        self.reconnect_delay = RECONNECT_DELAY_MIN
+        self.reconnect_at = 0
+
+    def current_hour(self, timestamp):
+        # The local hour only changes on the hour, so recompute it once per hour
+        if timestamp >= self._next_hour_at:
+            local = time.localtime(timestamp)
+            self._hour = local.tm_hour
+            self._next_hour_at = int(timestamp) - local.tm_min * 60 - local.tm_sec + 3600
+        return self._hour
+
     def generate_reading(self):
         timestamp = time.time()
-        dt = datetime.fromtimestamp(timestamp)
-        hour = dt.hour
-
-        daily_factor = 0.7 + 0.3 * (1 + np.sin((hour - 6) * np.pi / 12))
+        daily_factor = DAILY_FACTORS[self.current_hour(timestamp)]
         noise_factor = random.uniform(0.9, 1.1)
 
         power = 2000 * daily_factor * noise_factor
@@ -30,27 +75,17 @@ class EdgeDevice:
         frequency = 60.0 + random.uniform(-0.1, 0.1)
         current = power / voltage
 
-        return {
-            'timestamp': timestamp,
-            'voltage': voltage,
-            'current': current,
-            'power': power,
-            'frequency': frequency
-        }
+        return Reading(timestamp, voltage, current, power, frequency)
 
     def serialize_compact(self, reading):
-        timestamp_int = int(reading['timestamp']) & 0xFFFFFFFF
-        voltage_int = int(reading['voltage'] * 10) & 0xFFFF
-        current_int = int(reading['current'] * 10) & 0xFFFF
-        power_int = int(reading['power']) & 0xFFFF
-        frequency_int = int(reading['frequency'] * 10) & 0xFF
-
-        device_num = int(self.device_id.split('_')[1]) & 0xFFFF
-
-        data = struct.pack('>IHHHHB',
-                           timestamp_int, device_num, voltage_int,
-                           current_int, power_int, frequency_int)
-        return data
+        return RECORD_PACKER.pack(
+            int(reading.timestamp) & 0xFFFFFFFF,
+            self.device_num,
+            int(reading.voltage * 10) & 0xFFFF,
+            int(reading.current * 10) & 0xFFFF,
+            int(reading.power) & 0xFFFF,
+            int(reading.frequency * 10) & 0xFF,
+        )
 
     async def run(self):
         Logger.info(f"Device {self.device_id} starting...")
@@ -58,14 +93,18 @@ class EdgeDevice:
         while True:
             try:
                 reading = self.generate_reading()
-                data = self.serialize_compact(reading)
-                encrypted_data = self.aes_manager.encrypt_fixed_size(self.device_id, data)
-
-                await self.send_to_server(encrypted_data)
-                self.message_count += 1
-
-                if self.message_count % 20 == 0:
-                    Logger.success(f"{self.device_id}: Sent {self.message_count} messages (Power: {reading['power']:.1f}W)")
+                self.batch.append(self.serialize_compact(reading))
+
+                if len(self.batch) >= self.batch_size:
+                    encrypted_data = self.aes_manager.encrypt_batch(self.device_id, self.batch)
+                    if await self.send_to_server(encrypted_data):
+                        logged = self.message_count // 20
+                        self.message_count += len(self.batch)
+                        self.batch.clear()
+                        if self.message_count // 20 > logged:
+                            Logger.success(f"{self.device_id}: Sent {self.message_count} messages (Power: {reading.power:.1f}W)")
+                    else:
+                        del self.batch[:len(self.batch) - self.batch_size + 1]
 
                 await asyncio.sleep(self.interval)
 
@@ -73,19 +112,46 @@ class EdgeDevice:
                 Logger.error(f"{self.device_id}: {e}")
                 await asyncio.sleep(5)
 
-    async def send_to_server(self, encrypted_data):
-        try:
-            reader, writer = await asyncio.open_connection(self.server_host, self.server_port)
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.server_host, self.server_port)
+        tune_socket(self.writer)
+        self.pending_writes = 0
 
-            header = f"{self.device_id}:16\n".encode()
-            writer.write(header)
-            writer.write(encrypted_data)
-            await writer.drain()
+    def disconnect(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
 
-            writer.close()
-            await writer.wait_closed()
+    async def send_to_server(self, encrypted_data):
+        """Send one or more ciphertext blocks; returns False if they were dropped"""
+        try:
+            async with self.connect_lock:
+                if self.writer is None or self.writer.is_closing() or self.reader.at_eof():
+                    self.disconnect()
+                    # Readings taken while backing off are dropped, not queued
+                    if time.monotonic() < self.reconnect_at:
+                        return False
+                    await self.connect()
+
+            # Every 16-byte block is a separate message with its own header
+            self.writer.write(b''.join(
+                self.header + encrypted_data[i:i + BLOCK_SIZE]
+                for i in range(0, len(encrypted_data), BLOCK_SIZE)
+            ))
+
+            # The transport sends right away; drain only applies backpressure
+            self.pending_writes += 1
+            if self.pending_writes >= self.drain_every:
+                await self.writer.drain()
+                self.pending_writes = 0
+            self.reconnect_delay = RECONNECT_DELAY_MIN
+            return True
 
         except Exception as e:
-            if self.message_count % 100 == 0:
+            self.disconnect()
+            self.reconnect_at = time.monotonic() + self.reconnect_delay
+            self.reconnect_delay = min(self.reconnect_delay * 2, RECONNECT_DELAY_MAX)
+            self.failed_sends += 1
+            if self.failed_sends % 100 == 1:
                 Logger.warning(f"{self.device_id}: Connection error")
-                
\ No newline at end of file
+            return False
@@ -1,4 +1,4 @@
-from datetime import datetime
+import time
 
 # ANSI color codes
 RESET = '\033[0m'
@@ -10,9 +10,17 @@ CYAN = '\033[36m'
 BOLD = '\033[1m'
 
 class Logger:
+    # Lines logged within the same second reuse one formatted timestamp
+    _last_s = None
+    _last_str = ''
+
     @staticmethod
     def timestamp():
-        return datetime.now().strftime("%H:%M:%S")
+        s = int(time.time())
+        if s != Logger._last_s:
+            Logger._last_s = s
+            Logger._last_str = time.strftime("%H:%M:%S", time.localtime(s))
+        return Logger._last_str
 
     @staticmethod
     def info(msg):
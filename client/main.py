@@ -1,20 +1,53 @@
 #!/usr/bin/env python3
 import asyncio
 import argparse
+from .aes_manager import AESManager
 from .device import EdgeDevice
+from .logger import Logger
+from .net import install_event_loop, raise_fd_limit
+
+async def run_devices(devices, interval):
+    """Run devices with start times spread evenly over one reporting interval"""
+    async def run_staggered(device, delay):
+        await asyncio.sleep(delay)
+        await device.run()
+
+    # Starting every device at once makes them connect, and then report, in lockstep
+    step = interval / len(devices) if devices else 0
+    await asyncio.gather(*(run_staggered(device, i * step) for i, device in enumerate(devices)))
 
 def main():
     parser = argparse.ArgumentParser(description="Smart Meter Edge Device")
-    parser.add_argument("--device", required=True, help="Device ID")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--device", help="Device ID")
+    target.add_argument("--devices", type=int, help="Simulate devices meter_000000..N-1 in this process")
     parser.add_argument("--host", default="localhost", help="Server host")
     parser.add_argument("--port", type=int, default=8890, help="Server port")
     parser.add_argument("--interval", type=int, default=2, help="Reporting interval")
+    parser.add_argument("--batch", type=int, default=1, help="Readings to encrypt and send together (a failed send drops only the oldest)")
 
     args = parser.parse_args()
 
-    device = EdgeDevice(args.device, args.host, args.port, args.interval)
-    asyncio.run(device.run())
+    if args.device:
+        device = EdgeDevice(args.device, args.host, args.port, args.interval, batch_size=args.batch)
+        install_event_loop()
+        asyncio.run(device.run())
+        return
+
+    # Every simulated device holds its own connection
+    raise_fd_limit()
+
+    Logger.info(f"Generating keys for {args.devices} devices...")
+    aes_manager = AESManager()
+    devices = [
+        EdgeDevice(f"meter_{i:06d}", args.host, args.port, args.interval,
+                   aes_manager=aes_manager, batch_size=args.batch)
+        for i in range(args.devices)
+    ]
+    aes_manager.save_key_cache()
+
+    install_event_loop()
+    asyncio.run(run_devices(devices, args.interval))
 
 if __name__ == "__main__":
     main()
-    
\ No newline at end of file
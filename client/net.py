@@ -0,0 +1,39 @@
+import asyncio
+import socket
+
+SEND_BUFFER_SIZE = 1 << 20
+FD_LIMIT = 65536
+
+def tune_socket(writer):
+    """Disable Nagle and enlarge the send buffer on a freshly opened stream"""
+    sock = writer.get_extra_info('socket')
+    if sock is None:
+        return
+
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER_SIZE)
+
+    # Linux only: skip delayed ACKs on these short request bursts
+    if hasattr(socket, 'TCP_QUICKACK'):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+
+def install_event_loop():
+    """Run asyncio on uvloop when it is installed; the default loop otherwise"""
+    try:
+        import uvloop
+    except ImportError:
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
+def raise_fd_limit(limit=FD_LIMIT):
+    """Raise the soft open-file limit (up to the hard limit) for many concurrent sockets"""
+    try:
+        import resource
+    except ImportError:
+        return
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = limit if hard == resource.RLIM_INFINITY else min(limit, hard)
+    if soft != resource.RLIM_INFINITY and soft < target:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
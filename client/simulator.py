@@ -1,80 +1,199 @@
 #!/usr/bin/env python3
 import asyncio
 import argparse
+import os
+import signal
 import time
-import struct
-import random
-from .aes_manager import AESManager
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .aes_manager import AESManager, BLOCK_SIZE
 from .logger import Logger
+from .net import tune_socket, install_event_loop, raise_fd_limit
+
+# Same layout as struct.pack('>IHHHHB', ...), parsed by the server
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '>u4'), ('device_num', '>u2'), ('voltage', '>u2'),
+    ('current', '>u2'), ('power', '>u2'), ('frequency', 'u1')
+])
+
+# Nominal voltage, current, power and frequency plus their noise ranges (high exclusive)
+READING_BASE = np.array([1200, 167, 2000, 60], dtype=np.int32)
+NOISE_LOW = np.array([-20, -10, -100, -5])
+NOISE_HIGH = np.array([21, 11, 101, 6])
+
+def build_device_state(device_count, device_keys=None):
+    """Generate keys for meter_000000..device_count-1 and their message headers"""
+    # Device i gets index i in the fresh AESManager, so both are indexed by device number
+    aes_manager = AESManager(cached_keys=device_keys)
+    headers = []
+    for i in range(device_count):
+        device_id = f"meter_{i:06d}"
+        aes_manager.generate_device_key(device_id)
+        headers.append(f"{device_id}:16\n".encode())
+    return aes_manager, headers
+
+def encrypt_records(aes_manager, headers, first, blocks, device_pool_size):
+    """Encrypt masked blocks for messages first, first+1, ... into framed messages"""
+    messages = []
+    for offset in range(0, len(blocks), BLOCK_SIZE):
+        device_idx = (first + offset // BLOCK_SIZE) % device_pool_size
+        encrypted = aes_manager.encrypt_masked_block(device_idx, blocks[offset:offset + BLOCK_SIZE])
+        messages.append(headers[device_idx] + encrypted)
+    return messages
+
+# Encryption worker state, rebuilt once per worker process from the parent's keys
+_worker_aes_manager = None
+_worker_headers = None
+
+def _init_worker(device_keys):
+    global _worker_aes_manager, _worker_headers
+    # Forked workers inherit the parent's asyncio signal wakeup; let SIGTERM just end them
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    _worker_aes_manager, _worker_headers = build_device_state(len(device_keys), device_keys)
+
+def _encrypt_records_in_worker(first, blocks, device_pool_size):
+    return encrypt_records(_worker_aes_manager, _worker_headers, first, blocks, device_pool_size)
 
 class BatchedCipherGenerator:
-    def __init__(self, rate_per_second, server_host="localhost", server_port=8890):
+    def __init__(self, rate_per_second, server_host="localhost", server_port=8890, workers=None):
         self.rate = rate_per_second
         self.host = server_host
         self.port = server_port
-        self.aes_manager = AESManager()
         self.message_count = 0
         self.total_errors = 0
+        self._rng = np.random.default_rng()
 
         # Calculate optimal batch size and connection count
         self.messages_per_connection = min(50, max(5, rate_per_second // 20))
         self.max_concurrent_connections = min(20, max(5, rate_per_second // 100))
 
+        # Long-lived connections shared by all batches. The pool holds one entry
+        # per allowed connection; None marks a slot with no open connection yet,
+        # so its size is also the cap on concurrent sends
+        self.connection_pool = asyncio.Queue()
+        for _ in range(self.max_concurrent_connections):
+            self.connection_pool.put_nowait(None)
+        raise_fd_limit()
+
         # Pre-generate keys
         Logger.info(f"Pre-generating keys for rate of {rate_per_second} msgs/sec...")
         device_count = min(rate_per_second, 10000)
-        for i in range(device_count):
-            device_id = f"meter_{i:06d}"
-            self.aes_manager.generate_device_key(device_id)
+        self.aes_manager, self.headers = build_device_state(device_count)
+        self.aes_manager.save_key_cache()
+
+        # Workers receive the parent's keys instead of re-running PBKDF2
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.executor = None
+        if self.workers > 1:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker,
+                initargs=(self.aes_manager.device_keys,)
+            )
         Logger.success(f"Key generation complete (batch size: {self.messages_per_connection}, max connections: {self.max_concurrent_connections})")
 
-    def create_cipher_text(self, device_id):
-        timestamp = int(time.time()) & 0xFFFFFFFF
-        device_num = int(device_id.split('_')[1]) & 0xFFFF
+    def generate_readings(self, count):
+        """Generate a cycle of readings as parallel arrays (one entry per message)"""
+        noise = self._rng.integers(NOISE_LOW, NOISE_HIGH, size=(count, 4), dtype=np.int32)
+        voltage, current, power, frequency = (READING_BASE + noise).T
+        return voltage, current, power, frequency
+
+    def serialize_readings(self, timestamp, device_nums, voltage, current, power, frequency):
+        """Pack a cycle of readings into one (N, 13) uint8 array of fixed-size records"""
+        records = np.empty(len(device_nums), dtype=RECORD_DTYPE)
+        records['timestamp'] = timestamp
+        records['device_num'] = device_nums
+        records['voltage'] = voltage
+        records['current'] = current
+        records['power'] = power
+        records['frequency'] = frequency
+        return records.view(np.uint8).reshape(-1, RECORD_DTYPE.itemsize)
+
+    async def encrypt_cycle(self, blocks, device_pool_size):
+        """Encrypt a cycle's masked blocks, split across worker processes when enabled"""
+        if self.executor is None:
+            return encrypt_records(self.aes_manager, self.headers, 0, blocks, device_pool_size)
+
+        # A zero rate leaves nothing to split (and would make the chunk size 0)
+        count = len(blocks) // BLOCK_SIZE
+        if count == 0:
+            return []
+
+        loop = asyncio.get_running_loop()
+        chunk = -(-count // self.workers)
+        tasks = []
+        for first in range(0, count, chunk):
+            chunk_blocks = blocks[first * BLOCK_SIZE:(first + chunk) * BLOCK_SIZE]
+            tasks.append(loop.run_in_executor(
+                self.executor, _encrypt_records_in_worker, first, chunk_blocks, device_pool_size
+            ))
+
+        messages = []
+        for chunk_messages in await asyncio.gather(*tasks):
+            messages.extend(chunk_messages)
+        return messages
+
+    async def acquire_connection(self):
+        """Take a pooled connection, opening one if the slot is empty or stale"""
+        connection = await self.connection_pool.get()
+        if connection is not None:
+            reader, writer = connection
+            if not writer.is_closing() and not reader.at_eof():
+                return connection
+            writer.close()
+
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port),
+                timeout=5.0
+            )
+        except BaseException:
+            self.connection_pool.put_nowait(None)
+            raise
+        tune_socket(writer)
+        return reader, writer
 
-        voltage = 1200 + random.randint(-20, 20)
-        current = 167 + random.randint(-10, 10)
-        power = 2000 + random.randint(-100, 100)
-        frequency = 60 + random.randint(-5, 5)
+    def release_connection(self, connection):
+        self.connection_pool.put_nowait(connection)
 
-        data = struct.pack('>IHHHHB', timestamp, device_num, voltage, current, power, frequency)
-        encrypted = self.aes_manager.encrypt_fixed_size(device_id, data)
-        return f"{device_id}:16\n".encode() + encrypted
+    def discard_connection(self, connection):
+        reader, writer = connection
+        writer.close()
+        self.connection_pool.put_nowait(None)
 
     async def send_batch_on_single_connection(self, messages):
-        """Send multiple messages on a single connection"""
-        sent_count = 0
+        """Send multiple messages on one pooled connection"""
+        payload = b''.join(messages)
 
         for attempt in range(3):
+            connection = None
             try:
-                reader, writer = await asyncio.wait_for(
-                    asyncio.open_connection(self.host, self.port),
-                    timeout=5.0
-                )
+                connection = await self.acquire_connection()
+                reader, writer = connection
 
-                # Send all messages in this batch
-                for msg in messages:
-                    writer.write(msg)
-                    sent_count += 1
-
-                # Flush all at once
+                # Send all messages in this batch as one write and flush
+                writer.write(payload)
                 await asyncio.wait_for(writer.drain(), timeout=10.0)
 
-                # Close connection
-                writer.close()
-                await writer.wait_closed()
+                self.release_connection(connection)
+                return len(messages)
 
-                return sent_count
+            except asyncio.CancelledError:
+                # Give the slot back so a timed-out cycle cannot shrink the pool
+                if connection is not None:
+                    self.discard_connection(connection)
+                raise
 
             except Exception as e:
-                self.total_errors += len(messages) - sent_count
+                if connection is not None:
+                    self.discard_connection(connection)
+                self.total_errors += len(messages)
                 if attempt < 2:
                     await asyncio.sleep(0.5 * (attempt + 1))
-                    sent_count = 0  # Reset for retry
                 else:
                     Logger.error(f"Batch failed after retries: {e}")
 
-        return sent_count
+        return 0
 
     async def send_all_messages(self, messages):
         """Split messages into batches and send with controlled concurrency"""
@@ -85,15 +204,8 @@ class BatchedCipherGenerator:
             batch = messages[i:i + self.messages_per_connection]
             batches.append(batch)
 
-        # Control concurrency with semaphore
-        semaphore = asyncio.Semaphore(self.max_concurrent_connections)
-
-        async def send_batch_with_semaphore(batch):
-            async with semaphore:
-                return await self.send_batch_on_single_connection(batch)
-
-        # Send all batches concurrently
-        tasks = [send_batch_with_semaphore(batch) for batch in batches]
+        # Send all batches concurrently; the connection pool bounds how many are in flight
+        tasks = [self.send_batch_on_single_connection(batch) for batch in batches]
         results = await asyncio.gather(*tasks, return_exceptions=True)
 
         # Count successful sends
@@ -106,6 +218,20 @@ class BatchedCipherGenerator:
 
         return total_sent
 
+    def close(self):
+        """Stop the encryption workers so none outlive the generator"""
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    async def run_until_terminated(self):
+        """Run until cancelled by SIGTERM, which is how the bench scripts stop the generator"""
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        try:
+            await self.run()
+        except asyncio.CancelledError:
+            Logger.info("Generator terminated")
+
     async def run(self):
         Logger.info(f"Starting batched cipher generator at {self.rate} messages/second")
 
@@ -130,11 +256,11 @@ class BatchedCipherGenerator:
             cycle_count += 1
 
             # Generate messages for this cycle
-            messages = []
-            for i in range(self.rate):
-                device_id = f"meter_{i % device_pool_size:06d}"
-                cipher_text = self.create_cipher_text(device_id)
-                messages.append(cipher_text)
+            timestamp = int(time.time()) & 0xFFFFFFFF
+            device_nums = np.arange(self.rate) % device_pool_size
+            records = self.serialize_readings(timestamp, device_nums, *self.generate_readings(self.rate))
+            blocks = self.aes_manager.mask_records(device_nums, records)
+            messages = await self.encrypt_cycle(blocks, device_pool_size)
 
             # Send all messages
             try:
@@ -167,6 +293,7 @@ def main():
     parser.add_argument("--rate", type=int, required=True, help="Messages per second to generate")
     parser.add_argument("--host", default="localhost", help="Server host")
     parser.add_argument("--port", type=int, default=8890, help="Server port")
+    parser.add_argument("--workers", type=int, help="Encryption worker processes (default: CPU count, 1 = encrypt in the event loop)")
 
     # Legacy compatibility
     parser.add_argument("--devices", type=int, help="Legacy: use --rate instead")
@@ -184,12 +311,15 @@ def main():
     else:
         rate = args.rate
 
-    generator = BatchedCipherGenerator(rate, args.host, args.port)
+    generator = BatchedCipherGenerator(rate, args.host, args.port, args.workers)
+    install_event_loop()
 
     try:
-        asyncio.run(generator.run())
+        asyncio.run(generator.run_until_terminated())
     except KeyboardInterrupt:
         Logger.info("Generator stopped by user")
+    finally:
+        generator.close()
 
 if __name__ == "__main__":
     main()
@@ -47,7 +47,7 @@ cleanup() {
         kill "$SERVER_PID" 2>/dev/null
     fi
 
-    pkill -f "client/main.py --device meter_" 2>/dev/null
+    pkill -f "client.main --devices " 2>/dev/null
 
     sleep 3
 
@@ -70,8 +70,8 @@ cleanup() {
         kill -9 "$SERVER_PID" 2>/dev/null
     fi
 
-    pkill -f "client.main --device meter_" 2>/dev/null
-    pkill -9 -f "client.main --device meter_" 2>/dev/null
+    pkill -f "client.main --devices " 2>/dev/null
+    pkill -9 -f "client.main --devices " 2>/dev/null
 
     echo -e "${GREEN}[COMPLETE]${NC} Shutdown complete"
     exit 0
@@ -96,6 +96,9 @@ check_deps() {
         echo -e "${YELLOW}[INFO]${NC} Install with: pip install cryptography numpy"
         return 1
     fi
+    if ! python3 -c "import uvloop" 2>/dev/null; then
+        echo -e "${YELLOW}[INFO]${NC} Optional: pip install uvloop for a faster client event loop"
+    fi
 
     echo -e "${GREEN}[OK]${NC} All dependencies satisfied"
     return 0
@@ -129,43 +132,22 @@ start_devices() {
     local interval=$2
     local port=$3
 
-    echo -e "${BLUE}[DEVICES]${NC} Starting $num_devices edge devices..."
-
-    local batch_size=50
-    local batches=$((num_devices / batch_size))
-    local remainder=$((num_devices % batch_size))
-
-    for ((batch=0; batch<=batches; batch++)); do
-        local start_idx=$((batch * batch_size))
-        local end_idx=$((start_idx + batch_size))
-
-        if [ $batch -eq $batches ]; then
-            end_idx=$((start_idx + remainder))
-        fi
-
-        if [ $start_idx -ge $num_devices ]; then
-            break
-        fi
+    echo -e "${BLUE}[DEVICES]${NC} Starting $num_devices edge devices in one client process..."
 
-        for ((i=start_idx; i<end_idx; i++)); do
-            device_id=$(printf "meter_%06d" $i)
-            python3 -m client.main --device "$device_id" --host localhost --port "$port" --interval "$interval" &
-            local pid=$!
-            PIDS+=($pid)
-            echo "$pid" >> "$TEMP_PID_FILE"
+    # All devices run as asyncio tasks in a single interpreter
+    python3 -m client.main --devices "$num_devices" --host localhost --port "$port" --interval "$interval" &
+    local pid=$!
+    PIDS+=($pid)
+    echo "$pid" >> "$TEMP_PID_FILE"
 
-            if [ $((i % 25)) -eq 0 ]; then
-                sleep 0.05
-            fi
-        done
+    sleep 1
 
-        if [ $batch -lt $batches ] || [ $remainder -gt 0 ]; then
-            echo -e "${CYAN}[PROGRESS]${NC} Started batch $((batch + 1)): devices $start_idx-$((end_idx - 1))"
-            sleep 0.5
-        fi
-    done
+    if ! kill -0 "$pid" 2>/dev/null; then
+        echo -e "${RED}[ERROR]${NC} Edge device process failed to start"
+        return 1
+    fi
 
-    echo -e "${GREEN}[OK]${NC} Started $num_devices devices"
+    echo -e "${GREEN}[OK]${NC} Started $num_devices devices (PID: $pid)"
 }
 
 monitor() {
@@ -277,7 +259,9 @@ main() {
         exit 1
     fi
 
-    start_devices "$num_devices" "$interval" "$port"
+    if ! start_devices "$num_devices" "$interval" "$port"; then
+        exit 1
+    fi
     monitor
 }
 
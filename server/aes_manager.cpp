@@ -15,18 +15,36 @@ std::vector<uint8_t> AESManager::pbkdf2_sha256(const std::string& password, cons
     return key;
 }
 
-std::vector<uint8_t> AESManager::get_or_generate_key(const std::string& device_id) {
+std::vector<uint8_t> AESManager::derive_iv(const std::vector<uint8_t>& key, const std::string& device_id) {
+    unsigned char hash[32];
+    EVP_MD_CTX* ctx = EVP_MD_CTX_new();
+    if (!ctx) {
+        throw std::runtime_error("Failed to create hash context");
+    }
+
+    EVP_DigestInit_ex(ctx, EVP_sha256(), nullptr);
+    EVP_DigestUpdate(ctx, key.data(), key.size());
+    EVP_DigestUpdate(ctx, device_id.c_str(), device_id.length());
+    EVP_DigestFinal_ex(ctx, hash, nullptr);
+    EVP_MD_CTX_free(ctx);
+
+    return std::vector<uint8_t>(hash, hash + 16);
+}
+
+const AESManager::DeviceSecrets& AESManager::get_or_generate_secrets(const std::string& device_id) {
+    // Entries are never erased, and unordered_map references survive rehashing,
+    // so the returned reference stays valid after the lock is released
     {
         std::shared_lock<std::shared_mutex> lock(keys_mutex);
-        auto it = device_keys.find(device_id);
-        if (it != device_keys.end()) {
+        auto it = device_secrets.find(device_id);
+        if (it != device_secrets.end()) {
             return it->second;
         }
     }
 
     std::unique_lock<std::shared_mutex> lock(keys_mutex);
-    auto it = device_keys.find(device_id);
-    if (it != device_keys.end()) {
+    auto it = device_secrets.find(device_id);
+    if (it != device_secrets.end()) {
         return it->second;
     }
 
@@ -35,9 +53,12 @@ std::vector<uint8_t> AESManager::get_or_generate_key(const std::string& device_i
     std::string password = "smart_meter_" + device_id;
 
     auto key = pbkdf2_sha256(password, salt, 100000, 32);
-    device_keys[device_id] = key;
+    auto iv = derive_iv(key, device_id);
+    return device_secrets.emplace(device_id, DeviceSecrets{std::move(key), std::move(iv)}).first->second;
+}
 
-    return key;
+std::vector<uint8_t> AESManager::get_or_generate_key(const std::string& device_id) {
+    return get_or_generate_secrets(device_id).key;
 }
 
 std::vector<uint8_t> AESManager::decrypt_data(const std::string& device_id,
@@ -46,30 +67,17 @@ std::vector<uint8_t> AESManager::decrypt_data(const std::string& device_id,
         throw std::runtime_error("Expected exactly 16 bytes, got " + std::to_string(encrypted_data.size()));
     }
 
-    auto key = get_or_generate_key(device_id);
-
-    unsigned char hash[32];
-    EVP_MD_CTX* ctx = EVP_MD_CTX_new();
-    if (!ctx) {
-        throw std::runtime_error("Failed to create hash context");
-    }
-
-    EVP_DigestInit_ex(ctx, EVP_sha256(), nullptr);
-    EVP_DigestUpdate(ctx, key.data(), key.size());
-    EVP_DigestUpdate(ctx, device_id.c_str(), device_id.length());
-    EVP_DigestFinal_ex(ctx, hash, nullptr);
-    EVP_MD_CTX_free(ctx);
-
-    std::vector<uint8_t> iv(hash, hash + 16);
+    const auto& secrets = get_or_generate_secrets(device_id);
 
-    std::unique_ptr<EVP_CIPHER_CTX, decltype(&EVP_CIPHER_CTX_free)> cipher_ctx(
+    // One cipher context per worker thread, re-keyed for each message
+    thread_local std::unique_ptr<EVP_CIPHER_CTX, decltype(&EVP_CIPHER_CTX_free)> cipher_ctx(
         EVP_CIPHER_CTX_new(), EVP_CIPHER_CTX_free);
 
     if (!cipher_ctx) {
         throw std::runtime_error("Failed to create cipher context");
     }
 
-    if (EVP_DecryptInit_ex(cipher_ctx.get(), EVP_aes_256_cbc(), nullptr, key.data(), iv.data()) != 1) {
+    if (EVP_DecryptInit_ex(cipher_ctx.get(), EVP_aes_256_cbc(), nullptr, secrets.key.data(), secrets.iv.data()) != 1) {
         throw std::runtime_error("Failed to initialize decryption");
     }
 
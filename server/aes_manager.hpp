@@ -8,11 +8,19 @@
 
 class AESManager {
 private:
-    std::unordered_map<std::string, std::vector<uint8_t>> device_keys;
+    // Key and IV are both fixed per device, so derive them once on first use
+    struct DeviceSecrets {
+        std::vector<uint8_t> key;
+        std::vector<uint8_t> iv;
+    };
+
+    std::unordered_map<std::string, DeviceSecrets> device_secrets;
     mutable std::shared_mutex keys_mutex;
 
     std::vector<uint8_t> pbkdf2_sha256(const std::string& password, const std::string& salt,
                                        int iterations, int key_length);
+    std::vector<uint8_t> derive_iv(const std::vector<uint8_t>& key, const std::string& device_id);
+    const DeviceSecrets& get_or_generate_secrets(const std::string& device_id);
 
 public:
     std::vector<uint8_t> get_or_generate_key(const std::string& device_id);
@@ -5,7 +5,6 @@
 #include <iomanip>
 
 PowerSumProcessor::PowerSumProcessor(size_t count) : target_count(count) {
-    power_readings.reserve(target_count);
     Logger::info("PowerSumProcessor initialized - will sum every " + std::to_string(target_count) + " readings");
 }
 
@@ -19,14 +18,13 @@ void PowerSumProcessor::set_benchmark_target(size_t target_sums, std::function<v
 bool PowerSumProcessor::add_reading(double power) {
     std::lock_guard<std::mutex> lock(readings_mutex);
 
-    power_readings.push_back(power);
+    // Accumulate in arrival order, which gives the same total as summing a
+    // stored window at the end without keeping the readings around
+    running_sum += power;
     size_t count = ++current_count;
 
     if (count >= target_count) {
-        double sum = 0.0;
-        for (double p : power_readings) {
-            sum += p;
-        }
+        double sum = running_sum;
 
         total_sums++;
 
@@ -35,7 +33,7 @@ bool PowerSumProcessor::add_reading(double power) {
            << std::fixed << std::setprecision(2) << sum << " WATTS";
         Logger::sum_result(ss.str());
 
-        power_readings.clear();
+        running_sum = 0.0;
         current_count = 0;
 
         // Check if benchmark target reached
@@ -1,7 +1,6 @@
 // server/power_processor.hpp
 #pragma once
 
-#include <vector>
 #include <mutex>
 #include <cstddef>
 #include <functional>
@@ -9,7 +8,7 @@
 class PowerSumProcessor {
 private:
     size_t target_count;
-    std::vector<double> power_readings;
+    double running_sum{0.0};
     std::mutex readings_mutex;
     size_t current_count{0};
     size_t total_sums{0};
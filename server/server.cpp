@@ -2,6 +2,7 @@
 #include "server.hpp"
 #include "logger.hpp"
 #include <sys/socket.h>
+#include <sys/epoll.h>
 #include <netinet/in.h>
 #include <unistd.h>
 #include <sstream>
@@ -10,6 +11,7 @@
 #include <algorithm>
 #include <cstdlib>
 #include <cstring>
+#include <cerrno>
 #include <thread>
 
 // Global server pointer for signal handling
@@ -51,6 +53,12 @@ SmartGridServer::SmartGridServer(int p, size_t devices, size_t sum_interval,
 
 SmartGridServer::~SmartGridServer() {
     stop();
+    if (poller_thread.joinable()) {
+        poller_thread.join();
+    }
+    if (epoll_fd != -1) {
+        close(epoll_fd);
+    }
 }
 
 bool SmartGridServer::start() {
@@ -74,6 +82,13 @@ bool SmartGridServer::start() {
         return false;
     }
 
+    // Idle persistent connections are parked here instead of holding a worker thread
+    epoll_fd = epoll_create1(0);
+    if (epoll_fd < 0) {
+        Logger::error("epoll creation failed");
+        return false;
+    }
+
     int backlog = std::min(static_cast<int>(expected_devices), 1024);
     if (listen(server_fd, backlog) < 0) {
         Logger::error("Listen failed");
@@ -100,6 +115,8 @@ void SmartGridServer::run() {
 
     Logger::info("Server running - waiting for connections...");
 
+    poller_thread = std::thread([this]() { poll_idle_clients(); });
+
     while (!done.load()) {
         struct sockaddr_in client_addr{};
         socklen_t client_len = sizeof(client_addr);
@@ -120,31 +137,78 @@ void SmartGridServer::run() {
         });
     }
 
+    if (poller_thread.joinable()) {
+        poller_thread.join();
+    }
+
     Logger::info("Server stopped accepting connections");
 }
 
+bool SmartGridServer::park_client(int client_socket) {
+    struct epoll_event ev{};
+    ev.events = EPOLLIN | EPOLLRDHUP | EPOLLONESHOT;
+    ev.data.fd = client_socket;
+
+    // A previously parked socket stays registered (disarmed by EPOLLONESHOT)
+    if (epoll_ctl(epoll_fd, EPOLL_CTL_MOD, client_socket, &ev) == 0) {
+        return true;
+    }
+    return errno == ENOENT && epoll_ctl(epoll_fd, EPOLL_CTL_ADD, client_socket, &ev) == 0;
+}
+
+void SmartGridServer::poll_idle_clients() {
+    std::vector<struct epoll_event> events(256);
+
+    while (!done.load()) {
+        int n = epoll_wait(epoll_fd, events.data(), static_cast<int>(events.size()), 200);
+        for (int i = 0; i < n; i++) {
+            int client_socket = events[i].data.fd;
+            thread_pool->enqueue([this, client_socket]() {
+                handle_client(client_socket);
+            });
+        }
+    }
+}
+
 void SmartGridServer::handle_client(int client_socket) {
+    // Messages are parsed out of buffer starting at pos, so a whole burst of
+    // them costs one recv instead of one per header byte
     std::string buffer;
-    buffer.reserve(1024);
+    buffer.reserve(READ_CHUNK_SIZE);
+    size_t pos = 0;
 
     while (!done.load()) {
         // Read device ID and length line
-        std::string header = read_line(client_socket);
-        if (header.empty()) break;
+        size_t newline = buffer.find('\n', pos);
+        if (newline == std::string::npos) {
+            if (!read_more(client_socket, buffer, pos)) break;
+            continue;
+        }
+
+        std::string header = buffer.substr(pos, newline - pos);
+        if (!header.empty() && header.back() == '\r') header.pop_back();
 
         // Parse header: "device_id:length"
         size_t colon_pos = header.find(':');
-        if (colon_pos == std::string::npos) continue;
+        if (colon_pos == std::string::npos) {
+            pos = newline + 1;
+            continue;
+        }
 
         std::string device_id = header.substr(0, colon_pos);
         size_t data_length = std::stoull(header.substr(colon_pos + 1));
 
-        // Read encrypted data
-        std::vector<uint8_t> encrypted_data(data_length);
-        if (read_full(client_socket, encrypted_data.data(), data_length) != static_cast<ssize_t>(data_length)) {
-            break;
+        // Wait for the rest of the encrypted data; the header is parsed again
+        size_t data_start = newline + 1;
+        if (buffer.size() - data_start < data_length) {
+            if (!read_more(client_socket, buffer, pos)) break;
+            continue;
         }
 
+        std::vector<uint8_t> encrypted_data(buffer.begin() + data_start,
+                                            buffer.begin() + data_start + data_length);
+        pos = data_start + data_length;
+
         try {
             // Decrypt and parse reading
             auto decrypted = aes_manager.decrypt_data(device_id, encrypted_data);
@@ -154,32 +218,36 @@ void SmartGridServer::handle_client(int client_socket) {
         } catch (const std::exception& e) {
             Logger::error("Failed to process reading from " + device_id + ": " + e.what());
         }
+
+        if (pos < buffer.size()) continue;
+        buffer.clear();
+        pos = 0;
+
+        // Persistent clients go idle between readings; hand the socket back to
+        // the poller rather than blocking this worker until the next message.
+        // Only done with an empty buffer, so no partial message is dropped
+        char next;
+        ssize_t pending = recv(client_socket, &next, 1, MSG_PEEK | MSG_DONTWAIT);
+        if (pending < 0 && (errno == EAGAIN || errno == EWOULDBLOCK)) {
+            if (park_client(client_socket)) return;
+            break;
+        }
     }
 
     close(client_socket);
     connected_devices--;
 }
 
-std::string SmartGridServer::read_line(int fd) {
-    std::string line;
-    char c;
-    while (recv(fd, &c, 1, 0) == 1) {
-        if (c == '\n') break;
-        if (c != '\r') line += c;
-    }
-    return line;
-}
-
-ssize_t SmartGridServer::read_full(int fd, void* buf, size_t count) {
-    size_t total = 0;
-    char* ptr = static_cast<char*>(buf);
+bool SmartGridServer::read_more(int fd, std::string& buffer, size_t& pos) {
+    // Drop consumed bytes first so the buffer only holds the unparsed tail
+    buffer.erase(0, pos);
+    pos = 0;
 
-    while (total < count) {
-        ssize_t n = recv(fd, ptr + total, count - total, 0);
-        if (n <= 0) return n;
-        total += n;
-    }
-    return total;
+    char chunk[READ_CHUNK_SIZE];
+    ssize_t n = recv(fd, chunk, sizeof(chunk), 0);
+    if (n <= 0) return false;
+    buffer.append(chunk, n);
+    return true;
 }
 
 MeterReading SmartGridServer::parse_binary_reading(const std::vector<uint8_t>& data) {
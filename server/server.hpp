@@ -8,10 +8,15 @@
 #include <chrono>
 #include <string>
 #include <memory>
+#include <thread>
 
 class SmartGridServer {
 private:
+    static constexpr size_t READ_CHUNK_SIZE = 4096;
+
     int server_fd{-1};
+    int epoll_fd{-1};
+    std::thread poller_thread;
     int port;
     AESManager aes_manager;
     PowerSumProcessor processor;
@@ -39,9 +44,10 @@ private:
     std::atomic<bool> metrics_written{false};
 
     void handle_client(int client_fd);
+    bool park_client(int client_fd);
+    void poll_idle_clients();
     MeterReading parse_binary_reading(const std::vector<uint8_t>& data);
-    std::string read_line(int fd);
-    ssize_t read_full(int fd, void* buf, size_t count);
+    bool read_more(int fd, std::string& buffer, size_t& pos);
     void process_reading(const MeterReading& reading);
     void finalize_benchmark(double seconds);
     void stop_accept_loop();
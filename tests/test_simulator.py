@@ -0,0 +1,18 @@
+import asyncio
+import unittest
+
+from client.simulator import BatchedCipherGenerator
+
+
+class EncryptCycleTest(unittest.TestCase):
+    def test_empty_cycle_with_workers(self):
+        # A zero rate (or legacy --devices below --interval) gives an empty cycle
+        generator = BatchedCipherGenerator(0, workers=2)
+        try:
+            self.assertEqual(asyncio.run(generator.encrypt_cycle(b'', 0)), [])
+        finally:
+            generator.close()
+
+
+if __name__ == "__main__":
+    unittest.main()